@@ -20,18 +20,25 @@ Typical workflow (example: Cemu / BOTW):
 Notes:
 - For Cemu, the interesting saves usually live under: mlc01/usr/save/...
   and are organized by title IDs, region variants, and user slots.
+- Keep this next to savesync.py; file copies reuse its fast copy helper.
 """
 
 from __future__ import annotations
 
 import argparse
+import itertools
+import os
 import platform
+import re
 import shutil
+import subprocess
 import sys
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Iterable
+from typing import List, Iterator, Tuple
+
+from savesync import copy_file_nfs_safe
 
 
 # ---------------------- CONFIG ---------------------- #
@@ -50,10 +57,33 @@ def get_nas_root() -> Path:
         return Path("/mnt/nasemulation/saves_backup")
 
 
+# With --use-robocopy on Windows, trees with at least this many files are
+# restored by robocopy (native, multithreaded) instead of shutil.copytree.
+ROBOCOPY_MIN_FILES = 1000
+
+
+# A --find needle that looks like a (fragment of a) hex title id, e.g. "101c" or "101c9400".
+TITLE_ID_NEEDLE_RE = re.compile(r"^[0-9a-f]{4,8}$")
+HEX_NAME_RE = re.compile(r"^[0-9a-f]+$")
+
+
 @dataclass
 class SaveSource:
     name: str
     local_path: Path
+    # --find tuning (all optional):
+    #   search_prefixes: where to start looking, relative to NAS/<name>; the whole tree
+    #                    is searched if empty or none of them exist.
+    #   title_id_depth:  number of leading levels below a start point that are hex
+    #                    title-id components. For hex needles, non-hex directories at
+    #                    those levels are skipped; everything below them is still
+    #                    searched, since the needle may name a user/slot dir (80000001).
+    #   max_depth:       for hex needles, how many directory levels below a start point
+    #                    to descend (title ids and slots sit at a known depth). Other
+    #                    needles always search the whole tree.
+    search_prefixes: Tuple[str, ...] = ()
+    max_depth: int | None = None
+    title_id_depth: int = 0
 
 
 def get_save_sources() -> List[SaveSource]:
@@ -79,7 +109,12 @@ def get_save_sources() -> List[SaveSource]:
         ]
 
         cemu_root = Path(r"D:/Emulation/cemu")
-        sources.append(SaveSource("cemu_wiiu", cemu_root / "mlc01" / "usr" / "save"))
+        # Saves live under <title-id high>/<title-id low>/user/<slot>. The source is
+        # mlc01/usr/save itself, so NAS/cemu_wiiu needs no search_prefixes.
+        sources.append(SaveSource(
+            "cemu_wiiu", cemu_root / "mlc01" / "usr" / "save",
+            max_depth=4, title_id_depth=2,
+        ))
 
     else:
         sources += [
@@ -94,7 +129,12 @@ def get_save_sources() -> List[SaveSource]:
         ]
 
         cemu_root = Path("~/.var/app/info.cemu.Cemu/data/cemu").expanduser()
-        sources.append(SaveSource("cemu_wiiu", cemu_root / "mlc01" / "usr" / "save"))
+        # Saves live under <title-id high>/<title-id low>/user/<slot>. The source is
+        # mlc01/usr/save itself, so NAS/cemu_wiiu needs no search_prefixes.
+        sources.append(SaveSource(
+            "cemu_wiiu", cemu_root / "mlc01" / "usr" / "save",
+            max_depth=4, title_id_depth=2,
+        ))
 
     # Keep even if missing; restore might be used to repopulate missing dirs
     return sources
@@ -102,14 +142,93 @@ def get_save_sources() -> List[SaveSource]:
 
 # ---------------------- CORE HELPERS ---------------------- #
 
-def iter_dirs(root: Path) -> Iterable[Path]:
-    """Yield directories under root, including root itself, depth-first."""
+def iter_entries(root: Path | str) -> Iterator[os.DirEntry]:
+    """
+    Yield a DirEntry for everything under root (not root itself), depth-first,
+    each directory before its contents. Uses os.scandir so file types come from
+    the directory listing instead of a stat per entry (slow on NFS).
+    Symlinked directories are not descended into; unreadable directories are skipped.
+    """
+    try:
+        it = os.scandir(root)
+    except PermissionError:
+        return
+    with it:
+        for entry in it:
+            yield entry
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_entries(entry.path)
+
+
+def iter_matching_dirs(
+    root: Path,
+    needle_l: str,
+    search_prefixes: Tuple[str, ...] = (),
+    max_depth: int | None = None,
+    title_id_depth: int = 0,
+) -> Iterator[str]:
+    """
+    Yield relative paths ("." for root itself) of directories under root whose name
+    or relative path contains needle_l (already lowercased), depth-first.
+    Lazy: directories are only read as the caller asks for more results, so
+    stopping after N hits skips the rest of the tree.
+    See SaveSource for search_prefixes / max_depth / title_id_depth.
+    """
     if not root.is_dir():
         return
-    yield root
-    for p in root.rglob("*"):
-        if p.is_dir():
-            yield p
+    if needle_l in root.name.lower() or needle_l in ".":
+        yield "."
+    prefix_len = len(os.path.join(str(root), ""))
+    if not TITLE_ID_NEEDLE_RE.match(needle_l):
+        title_id_depth = 0
+        max_depth = None
+
+    starts = [os.path.normpath(p) for p in search_prefixes if (root / p).is_dir()] or [""]
+    for start in starts:
+        yield from _iter_matching_dirs(
+            os.path.join(str(root), start),
+            os.path.join(start.lower(), "") if start else "",
+            needle_l,
+            prefix_len,
+            1,
+            max_depth,
+            title_id_depth,
+        )
+
+
+def _iter_matching_dirs(
+    path: str,
+    rel_l: str,
+    needle_l: str,
+    prefix_len: int,
+    depth: int,
+    max_depth: int | None,
+    title_id_depth: int,
+) -> Iterator[str]:
+    """
+    Recursive helper for iter_matching_dirs; rel_l is the lowercased relative path of
+    path plus a separator, and depth is the level of path's children below the start point.
+    """
+    try:
+        it = os.scandir(path)
+    except PermissionError:
+        return
+    with it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            # Lowercase each name once; the relative path is only sliced out for hits.
+            name_l = entry.name.lower()
+            if depth <= title_id_depth and not HEX_NAME_RE.match(name_l):
+                continue  # can't be a title-id component
+            child_rel_l = rel_l + name_l
+            if needle_l in name_l or needle_l in child_rel_l:
+                yield entry.path[prefix_len:]
+            if entry.is_symlink() or (max_depth is not None and depth >= max_depth):
+                continue
+            yield from _iter_matching_dirs(
+                entry.path, child_rel_l + os.sep, needle_l, prefix_len, depth + 1, max_depth, title_id_depth
+            )
 
 
 def backup_existing(dest: Path, dry_run: bool) -> Path | None:
@@ -133,9 +252,40 @@ def backup_existing(dest: Path, dry_run: bool) -> Path | None:
     return backup_path
 
 
-def copy_tree(src: Path, dst: Path, dry_run: bool) -> None:
+def count_files(root: Path, limit: int) -> int:
+    """Count files under root, stopping once limit is reached."""
+    files = (e for e in iter_entries(root) if not e.is_dir())
+    return sum(1 for _ in itertools.islice(files, limit))
+
+
+def robocopy_tree(src: Path, dst: Path) -> None:
+    """
+    Copy src into dst with Windows' robocopy.
+    Raises CalledProcessError on failure (robocopy exit codes >= 8; lower codes mean success).
+    """
+    cmd = ["robocopy", str(src), str(dst), "/E", "/MT", "/NFL", "/NDL", "/NJH", "/NJS"]
+    result = subprocess.run(cmd)
+    if result.returncode >= 8:
+        raise subprocess.CalledProcessError(result.returncode, cmd)
+
+
+def fast_copy2(src: str, dst: str) -> str:
+    """
+    shutil.copy2 stand-in for copytree: contents via savesync's copy_file_range/sendfile
+    path, then timestamps/mode on a best-effort basis (NFS may refuse them).
+    """
+    copy_file_nfs_safe(src, dst)
+    try:
+        shutil.copystat(src, dst)
+    except OSError:
+        pass
+    return dst
+
+
+def copy_tree(src: Path, dst: Path, dry_run: bool, use_robocopy: bool = False) -> None:
     """
     Copy src directory to dst directory, creating dst if needed.
+    With use_robocopy on Windows, large new trees (>= ROBOCOPY_MIN_FILES files) go through robocopy.
     """
     print(f"  -> Restoring:")
     print(f"     {src}  ->  {dst}")
@@ -144,20 +294,18 @@ def copy_tree(src: Path, dst: Path, dry_run: bool) -> None:
         return
 
     dst.parent.mkdir(parents=True, exist_ok=True)
-    # Copy into dst; if dst doesn't exist, copytree is easiest.
-    if not dst.exists():
-        shutil.copytree(src, dst)
+    if (
+        use_robocopy
+        and platform.system() == "Windows"
+        and not dst.exists()
+        and count_files(src, ROBOCOPY_MIN_FILES) >= ROBOCOPY_MIN_FILES
+    ):
+        print("     (using robocopy)")
+        robocopy_tree(src, dst)
         return
 
-    # If dst exists (rare here because we back it up), merge copy:
-    for item in src.rglob("*"):
-        rel = item.relative_to(src)
-        target = dst / rel
-        if item.is_dir():
-            target.mkdir(parents=True, exist_ok=True)
-        else:
-            target.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(item, target)
+    # dirs_exist_ok merges into dst if it exists (rare here because we back it up).
+    shutil.copytree(src, dst, dirs_exist_ok=True, copy_function=fast_copy2)
 
 
 def normalize_relpath(p: str) -> Path:
@@ -180,22 +328,23 @@ def cmd_list_sources(sources: List[SaveSource]) -> int:
     return 0
 
 
-def cmd_find(nas_root: Path, source_name: str, needle: str, max_results: int) -> int:
+def cmd_find(nas_root: Path, sources: List[SaveSource], source_name: str, needle: str, max_results: int) -> int:
     src_root = nas_root / source_name
     if not src_root.is_dir():
         print(f"NAS source directory not found: {src_root}")
         return 2
 
-    needle_l = needle.lower()
     hits: List[Path] = []
-    for d in iter_dirs(src_root):
-        # Match on folder name or full relative path
-        rel = d.relative_to(src_root)
-        hay = str(rel).lower()
-        if needle_l in d.name.lower() or needle_l in hay:
-            hits.append(rel)
-            if len(hits) >= max_results:
-                break
+    # Unknown sources are still searchable, just without any pruning hints
+    source = next((s for s in sources if s.name == source_name), SaveSource(source_name, Path()))
+
+    # Match on folder name or full relative path
+    for rel in iter_matching_dirs(
+        src_root, needle.lower(), source.search_prefixes, source.max_depth, source.title_id_depth
+    ):
+        hits.append(Path(rel))
+        if len(hits) >= max_results:
+            break
 
     if not hits:
         print(f"No matches for '{needle}' under {src_root}")
@@ -209,7 +358,14 @@ def cmd_find(nas_root: Path, source_name: str, needle: str, max_results: int) ->
     return 0
 
 
-def cmd_restore(nas_root: Path, sources: List[SaveSource], source_name: str, rel_dir: str, dry_run: bool) -> int:
+def cmd_restore(
+    nas_root: Path,
+    sources: List[SaveSource],
+    source_name: str,
+    rel_dir: str,
+    dry_run: bool,
+    use_robocopy: bool = False,
+) -> int:
     source = next((s for s in sources if s.name == source_name), None)
     if not source:
         print(f"Unknown --source '{source_name}'. Run --list-sources to see options.")
@@ -232,7 +388,7 @@ def cmd_restore(nas_root: Path, sources: List[SaveSource], source_name: str, rel
     # Safety: back up existing destination directory if present
     backup_existing(dest_dir, dry_run=dry_run)
     # Restore
-    copy_tree(src_dir, dest_dir, dry_run=dry_run)
+    copy_tree(src_dir, dest_dir, dry_run=dry_run, use_robocopy=use_robocopy)
 
     print("\nDone.")
     if dry_run:
@@ -250,6 +406,11 @@ def main(argv: List[str]) -> int:
     parser.add_argument("--find", metavar="TEXT", help="Search NAS/<source> for directories matching TEXT (case-insensitive).")
     parser.add_argument("--max-results", type=int, default=30, help="Max results for --find (default 30).")
     parser.add_argument("--restore", metavar="REL_DIR", help="Restore a directory REL_DIR (relative to NAS/<source>) back to local.")
+    parser.add_argument(
+        "--use-robocopy",
+        action="store_true",
+        help=f"Windows only: restore large directories (>= {ROBOCOPY_MIN_FILES} files) with robocopy.",
+    )
     args = parser.parse_args(argv)
 
     nas_root = get_nas_root()
@@ -263,10 +424,12 @@ def main(argv: List[str]) -> int:
         return 2
 
     if args.find:
-        return cmd_find(nas_root, args.source, args.find, args.max_results)
+        return cmd_find(nas_root, sources, args.source, args.find, args.max_results)
 
     if args.restore:
-        return cmd_restore(nas_root, sources, args.source, args.restore, dry_run=args.dry_run)
+        return cmd_restore(
+            nas_root, sources, args.source, args.restore, dry_run=args.dry_run, use_robocopy=args.use_robocopy
+        )
 
     print("Nothing to do. Use --find or --restore (or --list-sources).")
     return 2
@@ -1,28 +1,35 @@
 #!/usr/bin/env python3
 """
-This script synchronizes local emulator save files with a central *NAS* directory. This two-stage design ensures consistent behavior across Windows, Linux, and Steam Deck, and avoids direct file thrashing between multiple clients. Key features:
+This script synchronizes local emulator save files with a central *NAS* directory. This design ensures consistent behavior across Windows, Linux, and Steam Deck, and avoids direct file thrashing between multiple clients. Key features:
 - Only overwrites destination if logic decides source is "newer."
-- Uses content hashing (SHA-256) + timestamp with skew allowance; it, does NOT rely purely on timestamps to detect changes.
+- Uses content hashing (BLAKE3 if the `blake3` package is installed, else SHA-256) + timestamp with skew allowance; it, does NOT rely purely on timestamps to detect changes.
 - Handles potential conflicts by keeping backups with hostname + timestamp.
+  Backups with identical contents are hardlinked to a single copy under <central>/.savesync-store.
+- Remembers file hashes in <central>/<source>/.savesync-manifest.sqlite so unchanged files aren't re-read next run.
 - Safe by default: never deletes anything, just copies/updates and keeps conflict backups when in doubt.
 
-The sync flow is local device ↔ NAS-location. Each machine runs this script, which performs the following steps in order:
-    1) Local emulator save dirs -> NAS central directory
-    2) NAS central directory    -> Local emulator saves dirs
+The sync flow is local device ↔ NAS-location. Each machine runs this script, which makes one pass per save dir
+over every file found on either side, decides once per file which side wins, and copies in that direction:
+    - Local emulator save dirs -> NAS central directory (push)
+    - NAS central directory    -> Local emulator saves dirs (pull)
 
 How this handles conflicts:
-- Step 1: Hash check first.
+- Step 0: Quick check (like rsync).
+    - If sizes differ, the files are different; hashing is skipped.
+    - If sizes match and mtimes agree within QUICK_CHECK_MTIME_EPSILON, the file is skipped unread.
+      Copies keep the source's mtime where the filesystem allows, so synced pairs stay quick-checkable.
+- Step 1: Hash check (only when sizes match but mtimes differ).
     - If content is identical, timestamps don't matter; the file is skipped.
 - Step 2: Timestamp + skew.
     - If one file's mtime is clearly newer (beyond SKEW_ALLOWANCE_SECONDS), that version wins.
-    - The other side will be updated when it is the "destination" in that direction.
+    - The older side is overwritten.
 - Step 3: Conflict window.
     - If mtimes are close (within skew allowance), that usually means:
         - Both changed around the same time, or
         - Clock skew is large enough, so don't trust the ordering.
     - In that case:
-        - Copy the source over the destination (so sync still happens),
-        - But first save a conflict backup of the overwritten file.
+        - Copy the local file over the NAS file (so sync still happens),
+        - But first save a conflict backup of the overwritten NAS file.
 
 Edit the CONFIG section below to match your setup. For example, my paths are:
 - Local central directory on Windows:           E:\saves_backup
@@ -31,20 +38,45 @@ Edit the CONFIG section below to match your setup. For example, my paths are:
 Run with:
     python savesync.py           # normal
     python savesync.py --dry-run # no actual copying, just logs
+    python savesync.py --workers 4  # fewer files in flight at once (default 16)
+    python savesync.py --io-backend uring  # Linux: batch stat calls through io_uring (needs `pip install liburing`)
+    python savesync.py --pipeline asyncio  # start checking files while the trees are still being walked
 """
 
 from __future__ import annotations
 import argparse
+import asyncio
+import ctypes
+import errno
 import hashlib
 import os
 import shutil
+import sqlite3
+import stat
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Iterator, List, Set, Tuple
 import platform
 import time
 
+try:
+    import liburing  # optional, Linux only: pip install liburing
+except ImportError:
+    liburing = None
+
+try:
+    import blake3  # optional, much faster than SHA-256: pip install blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import _winapi  # Windows only; CopyFile2 needs Python 3.12+
+except ImportError:
+    _winapi = None
+
 # ===================================================================== #
 # ------------------------------ CONFIG ------------------------------- #
 # ===================================================================== #
@@ -70,6 +102,47 @@ def get_central_nas_root() -> Path:
 # potential conflict and keep a backup of the overwritten file.
 SKEW_ALLOWANCE_SECONDS = 300  # 5 minutes
 
+# Quick check: files with equal size whose mtimes differ by less than this
+# (seconds) are assumed identical and are not hashed. Covers FAT/SMB mtime
+# rounding without reading either file.
+QUICK_CHECK_MTIME_EPSILON = 1.0
+
+# How many files are checked/copied at once. Most of the time per file is
+# spent waiting on NFS round trips, so keeping many in flight hides latency.
+DEFAULT_WORKERS = 16
+
+# How many files are read and hashed at once, whatever --workers is. Stats and
+# copies are cheap to overlap; many large sequential reads at once make an NFS
+# server seek between them.
+HASH_CONCURRENCY = 4
+
+# Per-source cache of file hashes, kept at <central>/<source.name>/MANIFEST_NAME.
+# Files whose size+mtime match the cache are not re-hashed on later runs.
+# Anything named ".savesync-*" is bookkeeping and is never synced.
+MANIFEST_NAME = ".savesync-manifest.sqlite"
+NAS_SIDE = "nas"  # manifest side for the NAS copy; local copies use the hostname
+RESERVED_PREFIX = ".savesync-"
+
+# Content-addressed store at <central>/STORE_NAME/<digest>. Conflict backups whose
+# hash is already known are hardlinked to one stored copy instead of each
+# keeping their own bytes.
+STORE_NAME = ".savesync-store"
+CONFLICT_MARKER = ".conflict-"
+
+# "threads": each worker stats its own files.
+# "uring":   stat every src/dst pair up front in io_uring batches (Linux, needs liburing),
+#            then hand the results to the workers. Falls back to "threads" if unavailable.
+IO_BACKENDS = ("threads", "uring")
+DEFAULT_IO_BACKEND = "threads"
+
+# How files are fed to the workers:
+# "pool":    walk both trees first, then map the file list over a thread pool.
+# "asyncio": stream files from the walk through a bounded queue to --workers consumers,
+#            so checking starts while the walk is still running.
+# Either way at most HASH_CONCURRENCY files are hashed at once.
+PIPELINES = ("pool", "asyncio")
+DEFAULT_PIPELINE = "pool"
+
 
 @dataclass
 class SaveSource:
@@ -151,152 +224,786 @@ def get_save_sources() -> List[SaveSource]:
 # ===================================================================== #
 # ---------------------- HELPER / CONFLICT LOGIC ---------------------- #
 # ===================================================================== #
-def copy_file_nfs_safe(src: Path, dst: Path) -> None:
+# Files are synced from several threads; keep each message block together.
+_PRINT_LOCK = threading.Lock()
+
+def log(*lines: str) -> None:
+    """Print lines as one uninterrupted block, safe to call from worker threads."""
+    with _PRINT_LOCK:
+        for line in lines:
+            print(line)
+
+# ---- fast_stat: statx(AT_STATX_DONT_SYNC) on Linux ---- #
+# A plain stat() on NFS can make the client revalidate attributes with the server.
+# The quick check is fine with the client's cached size/mtime, so ask statx() not to sync.
+_AT_FDCWD = -100
+_AT_STATX_DONT_SYNC = 0x4000
+_STATX_TYPE, _STATX_MODE, _STATX_MTIME, _STATX_SIZE = 0x1, 0x2, 0x40, 0x200
+
+class _StatxTimestamp(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_int64), ("tv_nsec", ctypes.c_uint32), ("_reserved", ctypes.c_int32)]
+
+class _Statx(ctypes.Structure):
+    """struct statx from <linux/stat.h> (256 bytes)."""
+    _fields_ = [
+        ("stx_mask", ctypes.c_uint32),
+        ("stx_blksize", ctypes.c_uint32),
+        ("stx_attributes", ctypes.c_uint64),
+        ("stx_nlink", ctypes.c_uint32),
+        ("stx_uid", ctypes.c_uint32),
+        ("stx_gid", ctypes.c_uint32),
+        ("stx_mode", ctypes.c_uint16),
+        ("_spare0", ctypes.c_uint16),
+        ("stx_ino", ctypes.c_uint64),
+        ("stx_size", ctypes.c_uint64),
+        ("stx_blocks", ctypes.c_uint64),
+        ("stx_attributes_mask", ctypes.c_uint64),
+        ("stx_atime", _StatxTimestamp),
+        ("stx_btime", _StatxTimestamp),
+        ("stx_ctime", _StatxTimestamp),
+        ("stx_mtime", _StatxTimestamp),
+        ("stx_rdev_major", ctypes.c_uint32),
+        ("stx_rdev_minor", ctypes.c_uint32),
+        ("stx_dev_major", ctypes.c_uint32),
+        ("stx_dev_minor", ctypes.c_uint32),
+        ("_spare", ctypes.c_uint64 * 14),
+    ]
+
+def _load_statx():
+    """Return glibc's statx() (glibc 2.28+), or None if unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fn = libc.statx
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.POINTER(_Statx))
+    fn.restype = ctypes.c_int
+    return fn
+
+_statx = _load_statx()
+
+def make_stat_result(mode: int, size: int, mtime: float) -> os.stat_result:
+    """Build an os.stat_result carrying only the fields the sync logic uses."""
+    return os.stat_result((mode, 0, 0, 0, 0, 0, size, 0, int(mtime), 0, 0.0, mtime, 0.0))
+
+def fast_stat(path: Path | str) -> os.stat_result:
+    """
+    Like os.stat(path), but on Linux uses statx(AT_STATX_DONT_SYNC) so NFS may answer
+    from its attribute cache. Only st_mode, st_size and st_mtime are meaningful.
+    Raises OSError (e.g. FileNotFoundError) like os.stat. Falls back to os.stat elsewhere.
+    """
+    global _statx
+    if _statx is None:
+        return os.stat(path)
+    buf = _Statx()
+    rc = _statx(
+        _AT_FDCWD,
+        os.fsencode(path),
+        _AT_STATX_DONT_SYNC,
+        _STATX_TYPE | _STATX_MODE | _STATX_MTIME | _STATX_SIZE,
+        ctypes.byref(buf),
+    )
+    if rc != 0:
+        err = ctypes.get_errno()
+        if err == errno.ENOSYS:  # kernel older than 4.11
+            _statx = None
+            return os.stat(path)
+        raise OSError(err, os.strerror(err), str(path))
+    mtime = buf.stx_mtime.tv_sec + buf.stx_mtime.tv_nsec / 1e9
+    return make_stat_result(buf.stx_mode, buf.stx_size, mtime)
+
+# The readinto() fallbacks for copying and hashing read 1 MiB per syscall into
+# a reused buffer. Files are handled on several threads, so each thread gets its own.
+_BUF_SIZE = 1 << 20
+_BUF_LOCAL = threading.local()
+
+def _io_buffer() -> Tuple[bytearray, memoryview]:
+    """Return this thread's reusable (buffer, memoryview) pair for readinto loops."""
+    try:
+        return _BUF_LOCAL.buf, _BUF_LOCAL.mv
+    except AttributeError:
+        _BUF_LOCAL.buf = bytearray(_BUF_SIZE)
+        _BUF_LOCAL.mv = memoryview(_BUF_LOCAL.buf)
+        return _BUF_LOCAL.buf, _BUF_LOCAL.mv
+
+# errno values meaning "this kernel/filesystem can't do that fast copy";
+# anything else (ENOSPC, EIO, ...) is a real error and is raised.
+_FASTCOPY_FALLBACK_ERRNOS = {
+    getattr(errno, name)
+    for name in ("EXDEV", "ENOSYS", "EINVAL", "EOPNOTSUPP", "ENOTSUP", "ENOTSOCK", "EBADF", "EPERM")
+    if hasattr(errno, name)
+}
+
+def _copy_fd_range(src_fd: int, dst_fd: int, size: int, blocksize: int) -> bool:
+    """
+    Copy with os.copy_file_range until EOF. On NFSv4.2 this is a server-side
+    copy and on btrfs/XFS a reflink, so the data never passes through this machine.
+    Returns False if unsupported here; the fd positions are left where it stopped.
+    Some filesystems (procfs-like, some FUSE) report 0 instead of an error; a 0
+    before any byte of a non-empty file is treated as unsupported, not as EOF.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = 0
+    try:
+        while n := os.copy_file_range(src_fd, dst_fd, blocksize):
+            copied += n
+    except OSError as e:
+        if e.errno in _FASTCOPY_FALLBACK_ERRNOS:
+            return False
+        raise
+    return copied > 0 or size == 0
+
+def _copy_fd_sendfile(src_fd: int, dst_fd: int, size: int, blocksize: int) -> bool:
+    """
+    Copy with os.sendfile until EOF (in-kernel, no userspace buffer).
+    Returns False if unsupported here; the fd positions are left where it stopped.
+    As with _copy_fd_range, a 0 before any byte of a non-empty file means unsupported.
+    """
+    if not hasattr(os, "sendfile") or sys.platform == "win32":
+        return False
+    copied = 0
+    try:
+        while n := os.sendfile(dst_fd, src_fd, None, blocksize):
+            copied += n
+    except OSError as e:
+        if e.errno in _FASTCOPY_FALLBACK_ERRNOS:
+            return False
+        raise
+    return copied > 0 or size == 0
+
+def _copy_file_windows(src: Path | str, dst: Path | str) -> None:
+    """
+    Copy with the native Win32 copy engine, which can offload the copy to an SMB
+    server instead of pulling the bytes through this machine.
+    Uses _winapi.CopyFile2 on Python 3.12+ and CopyFileW via ctypes before that.
+    The engine keeps src's timestamps, as the Linux path does.
+    If it fails (e.g. the share rejects its metadata calls), falls back to a
+    content-only shutil.copyfile and then sets the times where the share allows it.
+    """
+    try:
+        if _winapi is not None and hasattr(_winapi, "CopyFile2"):
+            _winapi.CopyFile2(str(src), str(dst), 0)
+        else:
+            kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+            kernel32.CopyFileW.argtypes = (ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_int)
+            if not kernel32.CopyFileW(str(src), str(dst), False):
+                raise ctypes.WinError(ctypes.get_last_error())
+        return
+    except OSError:
+        pass
+    shutil.copyfile(src, dst)   # content only
+    try:
+        src_st = os.stat(src)
+        os.utime(dst, ns=(src_st.st_atime_ns, src_st.st_mtime_ns))
+    except OSError:
+        pass
+
+def copy_file_nfs_safe(src: Path | str, dst: Path | str) -> None:
     """
     Copy file contents without failing on NFS metadata operations.
     Many NFS servers allow writing file contents but reject setting atime/mtime from clients.
+
+    On Windows, uses the native CopyFile2/CopyFileW engine.
+    Elsewhere, tries os.copy_file_range, then os.sendfile, then a plain 1 MiB readinto loop.
+    Each step picks up from the current file offsets, so a fallback mid-file is safe.
+    dst then gets src's atime/mtime where the server allows it, so the pair passes the
+    quick check next run; if it refuses, dst keeps the copy time and is hashed instead.
     """
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copyfile(src, dst)   # content only
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if platform.system() == "Windows":
+        _copy_file_windows(src, dst)
+        return
+
+    with open(src, "rb", buffering=0) as fsrc, open(dst, "wb", buffering=0) as fdst:   # content only
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        # Ask for the whole file per call (at least 8 MiB), capped to stay 32-bit safe.
+        src_st = os.fstat(src_fd)
+        size = src_st.st_size
+        blocksize = min(max(size, 1 << 23), 1 << 30)
+        if not (
+            _copy_fd_range(src_fd, dst_fd, size, blocksize)
+            or _copy_fd_sendfile(src_fd, dst_fd, size, blocksize)
+        ):
+            buf, mv = _io_buffer()
+            while n := fsrc.readinto(buf):
+                # Unbuffered writes may be short (signals, NFS); write until the chunk is out.
+                done = 0
+                while done < n:
+                    done += fdst.write(mv[done:n])
 
-def sha256_of_file(path: Path) -> str:
-    """Return SHA-256 hex digest of a file."""
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
+    # After close, so no pending NFS write can bump the mtime again.
+    try:
+        os.utime(dst, ns=(src_st.st_atime_ns, src_st.st_mtime_ns))
+    except OSError:
+        pass
+
+# Digests are tagged with their algorithm ("blake3-<hex>" / "sha256-<hex>"), so a
+# manifest or store written by a machine with the other algorithm is never
+# compared against the wrong kind of digest.
+DIGEST_NAME = "blake3" if blake3 is not None else "sha256"
+DIGEST_PREFIX = DIGEST_NAME + "-"
+
+def sha256_of_file(path: Path | str) -> str:
+    """
+    Return SHA-256 hex digest of a file.
+    Uses hashlib.file_digest (Python 3.11+), which loops in C with a large buffer;
+    older Pythons fall back to 1 MiB readinto() chunks.
+    """
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        buf, mv = _io_buffer()
+        while n := f.readinto(buf):
+            h.update(mv[:n])
     return h.hexdigest()
 
-def copy_with_smart_conflict(src: Path, dst: Path, dry_run: bool = False) -> bool:
+# Shared by every thread that hashes; see HASH_CONCURRENCY.
+_HASH_SLOTS = threading.Semaphore(HASH_CONCURRENCY)
+
+def content_digest_of_file(path: Path | str) -> str:
+    """
+    Return the tagged content digest of a file, used only for equality checks.
+    BLAKE3 (mmap + SIMD + multithreaded for large files) when available, else SHA-256.
+    At most HASH_CONCURRENCY calls read files at once; the rest wait their turn.
+    """
+    with _HASH_SLOTS:
+        if blake3 is not None:
+            h = blake3.blake3(max_threads=blake3.blake3.AUTO)
+            h.update_mmap(path)
+            return DIGEST_PREFIX + h.hexdigest()
+        return DIGEST_PREFIX + sha256_of_file(path)
+
+class HashManifest:
+    """
+    Persistent cache of (side, relative path) -> (size, mtime, content digest), stored
+    in SQLite. side is "nas" for files under the NAS copy of the source and the
+    hostname for this machine's local copy, so NAS entries are shared by every machine
+    whatever its mount point, and each machine keeps its own local entries.
+    Entries are read once at load time and new hashes are written back in a single
+    transaction by save(), so the database is only touched briefly per run.
+    Safe to use from worker threads.
     """
-    Copy src -> dst with smarter conflict logic:
-      - If dst does not exist: copy.
+
+    def __init__(
+        self,
+        db_path: Path,
+        local_root: Path,
+        nas_root: Path,
+        entries: Dict[Tuple[str, str], Tuple[int, float, str]],
+    ):
+        self.db_path = db_path
+        self._roots = (
+            (NAS_SIDE, os.path.join(str(nas_root), "")),
+            (platform.node() or "unknownhost", os.path.join(str(local_root), "")),
+        )
+        self._entries = entries
+        self._updates: Dict[Tuple[str, str], Tuple[int, float, str]] = {}
+        self._seen: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, db_path: Path, local_root: Path, nas_root: Path) -> HashManifest:
+        """
+        Read the manifest at db_path; a missing or unreadable manifest gives an empty cache.
+        Manifests from before the (side, path) keys have no "entries" table and are
+        read as empty; the next save() that writes drops their old table.
+        """
+        entries: Dict[Tuple[str, str], Tuple[int, float, str]] = {}
+        if db_path.is_file():
+            try:
+                con = sqlite3.connect(db_path)
+                try:
+                    if con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entries'").fetchone():
+                        for side, path, size, mtime, digest in con.execute(
+                            "SELECT side, path, size, mtime, digest FROM entries"
+                        ):
+                            entries[(side, path)] = (size, mtime, digest)
+                finally:
+                    con.close()
+            except sqlite3.Error as e:
+                print(f"Warning: ignoring unreadable manifest {db_path}: {e}")
+                entries = {}
+        return cls(db_path, local_root, nas_root, entries)
+
+    def _key(self, path: Path | str) -> Tuple[str, str] | None:
+        """(side, "/"-separated relative path) of path, or None if it is under neither root."""
+        path = str(path)
+        for side, prefix in self._roots:
+            if path.startswith(prefix):
+                return side, path[len(prefix):].replace(os.sep, "/")
+        return None
+
+    def seen(self, path: Path | str) -> None:
+        """Record that path exists this run; see save() for what happens to the rest."""
+        key = self._key(path)
+        if key is not None:
+            with self._lock:
+                self._seen.add(key)
+
+    def cached(self, path: Path | str, st: os.stat_result) -> str | None:
+        """Return the cached digest of path if its size and mtime still match, else None."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if (
+            entry is not None
+            and entry[0] == st.st_size
+            and entry[1] == st.st_mtime
+            and entry[2].startswith(DIGEST_PREFIX)
+        ):
+            return entry[2]
+        return None
+
+    def digest(self, path: Path | str, st: os.stat_result) -> str:
+        """Return the digest of path, reusing the cached one if size and mtime still match."""
+        digest = self.cached(path, st)
+        if digest is not None:
+            return digest
+
+        digest = content_digest_of_file(path)
+        key = self._key(path)
+        if key is not None:
+            with self._lock:
+                self._entries[key] = self._updates[key] = (st.st_size, st.st_mtime, digest)
+        return digest
+
+    def save(self, prune: bool = True) -> None:
+        """
+        Write new/changed entries back in one transaction.
+        With prune, and if any file was marked seen(), entries for this machine's side
+        and the NAS side that weren't seen are deleted (the file is gone); other
+        machines' entries are kept. Pass prune=False when the walk didn't finish.
+        """
+        sides = {side for side, _ in self._roots}
+        stale = [
+            key for key in self._entries
+            if prune and self._seen and key[0] in sides and key not in self._seen
+        ]
+        if not self._updates and not stale:
+            return
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(self.db_path)
+            try:
+                with con:
+                    con.execute("DROP TABLE IF EXISTS files")  # absolute-path manifest
+                    con.execute(
+                        "CREATE TABLE IF NOT EXISTS entries (side TEXT NOT NULL, path TEXT NOT NULL, "
+                        "size INTEGER NOT NULL, mtime REAL NOT NULL, digest TEXT NOT NULL, PRIMARY KEY (side, path))"
+                    )
+                    con.executemany("DELETE FROM entries WHERE side = ? AND path = ?", stale)
+                    con.executemany(
+                        "INSERT OR REPLACE INTO entries (side, path, size, mtime, digest) VALUES (?, ?, ?, ?, ?)",
+                        [(*key, *entry) for key, entry in self._updates.items()],
+                    )
+            finally:
+                con.close()
+        except sqlite3.Error as e:
+            print(f"Warning: could not update manifest {self.db_path}: {e}")
+            return
+        for key in stale:
+            del self._entries[key]
+        self._updates.clear()
+
+def _digest(path: Path | str, st: os.stat_result, manifest: HashManifest | None) -> str:
+    """Content digest of path, through the manifest cache when one is given."""
+    if manifest is None:
+        return content_digest_of_file(path)
+    return manifest.digest(path, st)
+
+# Outcomes of compare_files(src, dst)
+SKIP = "skip"            # src missing or not a regular file
+NEW = "new file"         # dst missing
+SAME = "same"            # identical (quick check or hash)
+SRC_NEWER = "src newer"  # differ, src mtime clearly newer
+DST_NEWER = "dst newer"  # differ, dst mtime clearly newer
+CONFLICT = "conflict"    # differ, mtimes within the skew window
+
+def compare_files(
+    src: Path | str,
+    dst: Path | str,
+    src_st: os.stat_result | None = None,
+    dst_st: os.stat_result | None = None,
+    manifest: HashManifest | None = None,
+    hash_pool: ThreadPoolExecutor | None = None,
+) -> str:
+    """
+    Decide how src relates to dst; returns one of the outcome constants above:
+      - If dst does not exist: NEW.
       - If dst exists:
-          * If contents identical (hash equal): do nothing.
+          * If sizes equal and mtimes within QUICK_CHECK_MTIME_EPSILON: SAME.
+          * If sizes equal and contents identical (hash equal): SAME.
           * Else:
               - If timestamps differ by more than SKEW_ALLOWANCE_SECONDS:
-                    newer timestamp wins.
-              - Else (within skew window, possible conflict):
-                    keep a backup of dst with .conflict-<hostname>-<time>
-                    then copy src over dst.
+                    SRC_NEWER / DST_NEWER (newer timestamp wins).
+              - Else (within skew window, possible conflict): CONFLICT.
 
-    Returns True if a copy would happen (or did happen), False otherwise.
+    src_st / dst_st may be passed in when the caller already has them; otherwise
+    each side is stat'ed exactly once here (each stat is a round trip on NFS).
+    With a manifest, hashes of files unchanged since an earlier run are reused.
+    With a hash_pool, dst is hashed on it while src is hashed in this thread, so a
+    slow NAS read overlaps the local one; HASH_CONCURRENCY still bounds both.
+    hashlib and blake3 release the GIL while digesting, as do the blocking reads.
     """
-    if not src.is_file():
-        return False
+    if src_st is None:
+        try:
+            src_st = fast_stat(src)
+        except OSError:
+            return SKIP
+    if not stat.S_ISREG(src_st.st_mode):
+        return SKIP
 
-    hostname = platform.node() or "unknownhost"
+    if dst_st is None:
+        try:
+            dst_st = fast_stat(dst)
+        except (FileNotFoundError, NotADirectoryError):
+            return NEW
+
+    # Both exist: reuse the stat results from above
+    dt = src_st.st_mtime - dst_st.st_mtime
+
+    # Quick check: a size mismatch means the contents differ, so only
+    # equal-size files ever need to be read.
+    if src_st.st_size == dst_st.st_size:
+        if abs(dt) < QUICK_CHECK_MTIME_EPSILON:
+            # Same size, same mtime: assume unchanged without hashing
+            return SAME
+        if hash_pool is not None:
+            dst_future = hash_pool.submit(_digest, dst, dst_st, manifest)
+            src_digest = _digest(src, src_st, manifest)
+            dst_digest = dst_future.result()
+        else:
+            src_digest = _digest(src, src_st, manifest)
+            dst_digest = _digest(dst, dst_st, manifest)
+        if src_digest == dst_digest:
+            # No real change
+            return SAME
+
+    # Clear "newest" decision based on skew allowance
+    if abs(dt) > SKEW_ALLOWANCE_SECONDS:
+        return SRC_NEWER if dt > 0 else DST_NEWER
+
+    # Within skew window: potential conflict
+    return CONFLICT
+
+def store_backup(path: str, digest: str, store_dir: Path) -> None:
+    """
+    Deduplicate a conflict backup through the content store: the first backup with a
+    given hash becomes the stored copy (hardlinked in), later ones are replaced by a
+    hardlink to it. Best effort: where hardlinks aren't supported (some SMB shares,
+    a store on another filesystem) the plain backup is kept.
+    """
+    store_path = os.path.join(store_dir, digest)
+    try:
+        os.makedirs(store_dir, exist_ok=True)
+        try:
+            os.link(path, store_path)
+            return
+        except FileExistsError:
+            pass
+        # Already stored: swap the backup for a link to the stored copy.
+        tmp = os.path.join(os.path.dirname(path), RESERVED_PREFIX + "link-" + os.path.basename(path))
+        os.link(store_path, tmp)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def transfer(
+    outcome: str,
+    src: Path | str,
+    dst: Path | str,
+    dry_run: bool = False,
+    manifest: HashManifest | None = None,
+    store_dir: Path | None = None,
+) -> bool:
+    """
+    Act on a compare_files(src, dst) outcome:
+      - NEW / SRC_NEWER: copy src over dst.
+      - CONFLICT: keep a backup of dst with .conflict-<hostname>-<time>, then copy src over dst.
+        With a manifest and store_dir, a backup whose hash is already known is deduplicated
+        via store_backup().
+      - Anything else: do nothing.
 
-    if not dst.exists():
-        print(f"  -> {dst}  (from {src}) [new file]")
+    Returns True if a copy would happen (or did happen), False otherwise.
+    """
+    if outcome in (NEW, SRC_NEWER):
+        log(f"  -> {dst}  (from {src}) [{outcome}]")
         if not dry_run:
-            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if CONFLICT_MARKER in os.path.basename(dst):
+                # Backups may be hardlinked into the store; never write through the link.
+                try:
+                    os.unlink(dst)
+                except FileNotFoundError:
+                    pass
             #shutil.copy2(src, dst)
             copy_file_nfs_safe(src, dst)
         return True
 
-    # Both exist: check contents first
-    src_hash = sha256_of_file(src)
-    dst_hash = sha256_of_file(dst)
-
-    if src_hash == dst_hash:
-        # No real change
+    if outcome != CONFLICT:
         return False
 
-    src_mtime = src.stat().st_mtime
-    dst_mtime = dst.stat().st_mtime
-    dt = src_mtime - dst_mtime
-
-    # Clear "newest" decision based on skew allowance
-    if abs(dt) > SKEW_ALLOWANCE_SECONDS:
-        if dt > 0:
-            # Source clearly newer
-            print(f"  -> {dst}  (from {src}) [src newer]")
-            if not dry_run:
-                dst.parent.mkdir(parents=True, exist_ok=True)
-                #shutil.copy2(src, dst)
-                copy_file_nfs_safe(src, dst)
-            return True
-        else:
-            # Destination clearly newer – do nothing.
-            # When we iterate from the other side, dst will act as src.
-            return False
-
-    # Within skew window: potential conflict
     # We choose to let src win but keep a backup of old dst.
-    conflict_path = dst.with_suffix(
-        dst.suffix + f".conflict-{hostname}-{int(time.time())}"
+    hostname = platform.node() or "unknownhost"
+    conflict_path = f"{dst}{CONFLICT_MARKER}{hostname}-{int(time.time())}"
+    log(
+        f"  !! Possible conflict on {dst}",
+        f"     Keeping backup at {conflict_path}",
+        f"     Overwriting with {src}",
     )
-    print(f"  !! Possible conflict on {dst}")
-    print(f"     Keeping backup at {conflict_path}")
-    print(f"     Overwriting with {src}")
 
     if not dry_run:
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        #shutil.copy2(dst, conflict_path)
-        copy_file_nfs_safe(dst, conflict_path)
+        # The backup sits next to dst, so a rename moves it there without
+        # re-reading and re-writing the file; src is then copied to a fresh dst.
+        os.replace(dst, conflict_path)
         #shutil.copy2(src, dst)
         copy_file_nfs_safe(src, dst)
+        if manifest is not None and store_dir is not None:
+            # Only hashes we already have (from this run or the manifest); the rename
+            # kept dst's size and mtime, so the cached entry for dst still applies.
+            digest = manifest.cached(dst, fast_stat(conflict_path))
+            if digest is not None:
+                store_backup(conflict_path, digest, store_dir)
 
     return True
 
 # ==================================================================== #
-# ---------------------------- SYNC LOGIC ---------------------------- #
+# ------------------- IO_URING BACKEND (Linux only) ------------------ #
 # ==================================================================== #
-def sync_source_to_central(source: SaveSource, central_root: Path, dry_run: bool = False) -> None:
+URING_QUEUE_DEPTH = 256
+
+def uring_available() -> bool:
+    """True if liburing is installed and the kernel lets us set up a ring."""
+    if liburing is None:
+        return False
+    ring = liburing.Ring()
+    try:
+        liburing.io_uring_queue_init(1, ring)
+    except OSError:
+        return False
+    liburing.io_uring_queue_exit(ring)
+    return True
+
+def uring_stat_many(paths: List[Path | str]) -> List[os.stat_result | None]:
     """
-    Sync one SaveSource directory into central_root / <source.name> / ...
-    (local emulator -> central NAS)
+    statx() every path through io_uring, URING_QUEUE_DEPTH requests per submission,
+    instead of one blocking stat syscall (and NFS round trip) at a time.
+    Uses AT_STATX_DONT_SYNC like fast_stat.
+    Returns one entry per path; None where the stat failed (e.g. file missing).
     """
-    src_root = source.path
-    dest_root = central_root / source.name
+    mask = liburing.STATX_TYPE | liburing.STATX_MODE | liburing.STATX_SIZE | liburing.STATX_MTIME
+    results: List[os.stat_result | None] = [None] * len(paths)
+    ring = liburing.Ring()
+    cqe = liburing.Cqe()
+    liburing.io_uring_queue_init(URING_QUEUE_DEPTH, ring)
+    try:
+        for start in range(0, len(paths), URING_QUEUE_DEPTH):
+            batch = paths[start:start + URING_QUEUE_DEPTH]
+            stats = [liburing.Statx() for _ in batch]
+            for i, (path, stx) in enumerate(zip(batch, stats)):
+                sqe = liburing.io_uring_get_sqe(ring)
+                liburing.io_uring_prep_statx(sqe, stx, str(path), liburing.AT_STATX_DONT_SYNC, mask)
+                liburing.io_uring_sqe_set_data64(sqe, i)
+            liburing.io_uring_submit_and_wait(ring, len(batch))
 
-    print(f"\n=== Pushing {source.name} -> NAS ===")
-    print(f"Source:      {src_root}")
-    print(f"Destination: {dest_root}")
-    print(f"Mode:        {'DRY RUN' if dry_run else 'LIVE'}")
+            pending = len(batch)
+            while pending:
+                liburing.io_uring_wait_cqe(ring, cqe)
+                ready = liburing.io_uring_cq_ready(ring)
+                for k in range(ready):
+                    entry = cqe[k]
+                    i = liburing.io_uring_cqe_get_data64(entry)
+                    try:
+                        entry.res  # raises the matching OSError for a failed statx
+                    except OSError:
+                        continue
+                    stx = stats[i]
+                    results[start + i] = make_stat_result(stx.mode, stx.size, stx.mtime)
+                liburing.io_uring_cq_advance(ring, ready)
+                pending -= ready
+    finally:
+        liburing.io_uring_queue_exit(ring)
+    return results
 
-    if not src_root.is_dir():
-        print(f"  !! Skipping: source directory not found.")
+# ==================================================================== #
+# ---------------------------- SYNC LOGIC ---------------------------- #
+# ==================================================================== #
+def walk_files(root: Path | str) -> Iterator[os.DirEntry]:
+    """
+    Yield a DirEntry for every file under root, recursively.
+    os.scandir reports entry types from the directory listing itself, so unlike
+    rglob + is_file() there is no extra stat (an NFS round trip) per entry.
+    Symlinked directories are not descended into; unreadable directories are skipped,
+    as are savesync's own ".savesync-*" files.
+    """
+    try:
+        it = os.scandir(root)
+    except PermissionError:
         return
+    with it:
+        for entry in it:
+            if entry.name.startswith(RESERVED_PREFIX):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path)
+            elif entry.is_file():
+                yield entry
 
-    copied = 0
-    for path in src_root.rglob("*"):
-        if path.is_file():
-            rel = path.relative_to(src_root)
-            dest = dest_root / rel
-            if copy_with_smart_conflict(path, dest, dry_run=dry_run):
-                copied += 1
+def list_files(root: Path) -> Dict[str, str]:
+    """
+    Map relative path -> full path for every file under root (empty if root is missing).
+    Plain strings, not Path objects: the relative part is sliced off entry.path.
+    """
+    if not root.is_dir():
+        return {}
+    prefix = os.path.join(str(root), "")
+    cut = len(prefix)
+    return {entry.path[cut:]: entry.path for entry in walk_files(prefix)}
+
+# (local path, NAS path, exists locally, exists on NAS)
+SyncJob = Tuple[str, str, bool, bool]
 
-    print(f"  Done: {copied} file(s) {'would be ' if dry_run else ''}copied/updated.")
+def iter_sync_jobs(local_root: Path, nas_root: Path) -> Iterator[SyncJob]:
+    """
+    Lazily yield one job per file in the union of both trees: local files as the
+    local walk finds them, then files that only exist on the NAS.
+    """
+    nas_files = list_files(nas_root)
+    local_prefix = os.path.join(str(local_root), "")
+    nas_prefix = os.path.join(str(nas_root), "")
+    cut = len(local_prefix)
 
+    seen = set()
+    for entry in walk_files(local_prefix):
+        rel = entry.path[cut:]
+        seen.add(rel)
+        yield (entry.path, nas_files.get(rel, nas_prefix + rel), True, rel in nas_files)
+    for rel, path in nas_files.items():
+        if rel not in seen:
+            yield (local_prefix + rel, path, False, True)
 
-def sync_central_to_source(source: SaveSource, central_root: Path, dry_run: bool = False) -> None:
+async def run_pipeline(jobs: Iterator[SyncJob], run: Callable[[SyncJob], str | None], workers: int) -> List[str | None]:
     """
-    Sync central_root / <source.name> / ... back into source.path
-    (central NAS -> local emulator)
+    asyncio alternative to the thread pool: a producer thread pulls jobs (i.e. walks
+    the trees) into an asyncio.Queue, and `workers` consumers each hand jobs to
+    asyncio.to_thread. Checks start before the walk is finished. At most 4 * workers
+    jobs wait in the queue, so the walker can't run far ahead of the checks.
     """
-    dest_root = source.path
-    src_root = central_root / source.name
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=workers + 1, thread_name_prefix="savesync-sync"))
+    queue: asyncio.Queue[SyncJob | None] = asyncio.Queue()
+    slots = threading.Semaphore(4 * workers)
+    stop = threading.Event()  # set when the consumers are gone (error or Ctrl-C)
+    results: List[str | None] = []
 
-    print(f"\n=== Pulling NAS -> {source.name} ===")
-    print(f"Source:      {src_root}")
-    print(f"Destination: {dest_root}")
+    def produce() -> None:
+        try:
+            for job in jobs:
+                # Poll so a blocked producer notices `stop` instead of hanging shutdown
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                loop.call_soon_threadsafe(queue.put_nowait, job)
+        finally:
+            for _ in range(workers):
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    async def consume() -> None:
+        while (job := await queue.get()) is not None:
+            slots.release()
+            results.append(await asyncio.to_thread(run, job))
+
+    try:
+        await asyncio.gather(asyncio.to_thread(produce), *(consume() for _ in range(workers)))
+    finally:
+        stop.set()
+    return results
+
+def sync_bidirectional(
+    source: SaveSource,
+    central_root: Path,
+    dry_run: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    io_backend: str = DEFAULT_IO_BACKEND,
+    manifest: HashManifest | None = None,
+    pipeline: str = DEFAULT_PIPELINE,
+) -> None:
+    """
+    Sync source.path <-> central_root / <source.name> in a single pass.
+    Each file in either tree is compared once (local as src, NAS as dst) and copied
+    in whichever direction wins; on a conflict the local copy wins and the NAS copy is
+    backed up. This has the same effect as a local->NAS pass followed by a NAS->local pass.
+    With io_backend="uring" (pool pipeline only), every file is stat'ed up front in io_uring batches.
+    """
+    local_root = source.path
+    nas_root = central_root / source.name
+    store_dir = central_root / STORE_NAME
+
+    print(f"\n=== Syncing {source.name} <-> NAS ===")
+    print(f"Local:       {local_root}")
+    print(f"NAS:         {nas_root}")
     print(f"Mode:        {'DRY RUN' if dry_run else 'LIVE'}")
 
-    if not src_root.is_dir():
-        print(f"  !! Skipping: central directory not found.")
+    if not local_root.is_dir():
+        print(f"  !! Skipping: source directory not found.")
         return
 
-    copied = 0
-    for path in src_root.rglob("*"):
-        if path.is_file():
-            rel = path.relative_to(src_root)
-            dest = dest_root / rel
-            if copy_with_smart_conflict(path, dest, dry_run=dry_run):
-                copied += 1
+    def run(job: SyncJob, local_st: os.stat_result | None = None, nas_st: os.stat_result | None = None) -> str | None:
+        local, nas, in_local, in_nas = job
+        if manifest is not None:
+            if in_local:
+                manifest.seen(local)
+            if in_nas:
+                manifest.seen(nas)
+        if not in_local:
+            # Only on the NAS: pull
+            outcome = compare_files(nas, local, src_st=nas_st, manifest=manifest, hash_pool=hash_pool)
+            return "pull" if transfer(outcome, nas, local, dry_run=dry_run, manifest=manifest) else None
+        outcome = compare_files(
+            local, nas, src_st=local_st, dst_st=nas_st, manifest=manifest, hash_pool=hash_pool
+        )
+        if outcome == DST_NEWER:
+            return "pull" if transfer(SRC_NEWER, nas, local, dry_run=dry_run, manifest=manifest) else None
+        pushed = transfer(outcome, local, nas, dry_run=dry_run, manifest=manifest, store_dir=store_dir)
+        return "push" if pushed else None
+
+    # dst hashes run here; more threads than HASH_CONCURRENCY would only wait on it.
+    with ThreadPoolExecutor(max_workers=HASH_CONCURRENCY, thread_name_prefix="savesync-hash") as hash_pool:
+        if pipeline == "asyncio":
+            results = asyncio.run(run_pipeline(iter_sync_jobs(local_root, nas_root), run, max(workers, 1)))
+        else:
+            jobs = list(iter_sync_jobs(local_root, nas_root))
+            stats: List[os.stat_result | None] = [None] * (2 * len(jobs))
+            if io_backend == "uring" and jobs:
+                # Only stat paths known to exist; a missing side is left as None and costs
+                # the worker one failed stat.
+                wanted: List[int] = []  # indexes into stats: 2*i = local, 2*i+1 = NAS
+                for i, (_, _, in_local, in_nas) in enumerate(jobs):
+                    if in_local:
+                        wanted.append(2 * i)
+                    if in_nas:
+                        wanted.append(2 * i + 1)
+                for k, st in zip(wanted, uring_stat_many([jobs[k // 2][k % 2] for k in wanted])):
+                    stats[k] = st
+
+            def run_indexed(i: int) -> str | None:
+                return run(jobs[i], stats[2 * i], stats[2 * i + 1])
+
+            if workers <= 1:
+                results = list(map(run_indexed, range(len(jobs))))
+            else:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="savesync-sync") as ex:
+                    results = list(ex.map(run_indexed, range(len(jobs))))
 
-    print(f"  Done: {copied} file(s) {'would be ' if dry_run else ''}copied/updated.")
+    pushed, pulled = results.count("push"), results.count("pull")
+    print(
+        f"  Done: {pushed} file(s) {'would be ' if dry_run else ''}pushed to NAS, "
+        f"{pulled} {'would be ' if dry_run else ''}pulled from NAS."
+    )
 
 
 def main(argv: List[str]) -> int:
@@ -308,8 +1015,34 @@ def main(argv: List[str]) -> int:
         action="store_true",
         help="Show what would be copied without actually copying.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of files to check/copy in parallel (default {DEFAULT_WORKERS}; 1 = serial).",
+    )
+    parser.add_argument(
+        "--io-backend",
+        choices=IO_BACKENDS,
+        default=DEFAULT_IO_BACKEND,
+        help="How file metadata is read: 'threads' (default) or 'uring' (Linux, batched via liburing).",
+    )
+    parser.add_argument(
+        "--pipeline",
+        choices=PIPELINES,
+        default=DEFAULT_PIPELINE,
+        help="How files are fed to the workers: 'pool' (default) or 'asyncio' (streamed from the walk).",
+    )
     args = parser.parse_args(argv)
 
+    io_backend = args.io_backend
+    if io_backend == "uring" and args.pipeline == "asyncio":
+        print("Warning: --io-backend uring needs the full file list up front; ignored with --pipeline asyncio.")
+        io_backend = "threads"
+    if io_backend == "uring" and not uring_available():
+        print("Warning: io_uring backend unavailable (liburing not installed or kernel refused); using threads.")
+        io_backend = "threads"
+
     central = get_central_nas_root()
     central.mkdir(parents=True, exist_ok=True)
 
@@ -323,10 +1056,24 @@ def main(argv: List[str]) -> int:
 
     start = time.time()
     for src in sources:
-        # 1) Push local -> NAS
-        sync_source_to_central(src, central, dry_run=args.dry_run)
-        # 2) Pull NAS -> local
-        sync_central_to_source(src, central, dry_run=args.dry_run)
+        manifest = HashManifest.load(central / src.name / MANIFEST_NAME, src.path, central / src.name)
+        completed = False
+        try:
+            sync_bidirectional(
+                src,
+                central,
+                dry_run=args.dry_run,
+                workers=args.workers,
+                io_backend=io_backend,
+                manifest=manifest,
+                pipeline=args.pipeline,
+            )
+            completed = True
+        finally:
+            # Keep the hashes computed so far even if one file aborted the sync, but
+            # only prune after a full walk: an aborted one hasn't seen every file.
+            if not args.dry_run:
+                manifest.save(prune=completed)
 
     elapsed = time.time() - start
     print(f"\nAll done in {elapsed:.1f} seconds.")